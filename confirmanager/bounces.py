@@ -0,0 +1,79 @@
+# coding: utf-8
+""" Parsers turning bounce/complaint reports into ``(email, reason)`` pairs
+    suitable for ``SuppressedEmail.objects.suppress``.
+"""
+import json
+import mailbox
+
+from django.utils import six
+
+from .models import SuppressedEmail
+
+
+COMPLAINT_TYPES = ('complaint', 'spamreport', 'spam_report', 'abuse')
+
+
+def parse_events(payload):
+    """ Webhook batch: a list of events, ``{"events": [...]}`` or a single event,
+        each event being ``{"email": ..., "type": "bounce"|"complaint"}``.
+        Soft bounces are skipped, they should not suppress an address.
+        Raises ValueError for malformed payloads.
+    """
+    if isinstance(payload, dict):
+        payload = payload['events'] if 'events' in payload else [payload]
+    if not isinstance(payload, list):
+        raise ValueError('Expected a list of events')
+    events = []
+    for event in payload:
+        if not isinstance(event, dict):
+            raise ValueError('Event must be an object')
+        email = event.get('email')
+        event_type = event.get('type', SuppressedEmail.REASON_BOUNCE)
+        if not isinstance(email, six.string_types) or not isinstance(event_type, six.string_types):
+            raise ValueError('Event email and type must be strings')
+        if not email or event.get('bounce_type', 'hard') != 'hard':
+            continue
+        if event_type.lower() in COMPLAINT_TYPES:
+            events.append((email, SuppressedEmail.REASON_COMPLAINT))
+        else:
+            events.append((email, SuppressedEmail.REASON_BOUNCE))
+    return events
+
+
+def parse_json_dump(fileobj):
+    """ Either a single JSON document or one JSON event per line """
+    content = fileobj.read()
+    try:
+        payload = json.loads(content)
+    except ValueError:
+        payload = [json.loads(line) for line in content.splitlines() if line.strip()]
+    return parse_events(payload)
+
+
+def _strip_address_type(value):
+    # "rfc822; foo@bar.com" -> "foo@bar.com"
+    return value.split(';', 1)[-1].strip().strip('<>')
+
+
+def parse_message(message):
+    """ DSN (RFC 3464) and ARF (RFC 5965) reports """
+    for address in message.get_all('X-Failed-Recipients', []):
+        yield address.strip(), SuppressedEmail.REASON_BOUNCE
+    for part in message.walk():
+        content_type = part.get_content_type()
+        if content_type == 'message/delivery-status':
+            # per-recipient fields are stored as payload sub-messages
+            for fields in part.get_payload()[1:]:
+                if fields.get('Action', '').lower() == 'failed' and fields.get('Final-Recipient'):
+                    yield _strip_address_type(fields['Final-Recipient']), SuppressedEmail.REASON_BOUNCE
+        elif content_type == 'message/feedback-report':
+            for fields in part.get_payload():
+                recipient = fields.get('Original-Rcpt-To') or fields.get('Removal-Recipient')
+                if recipient:
+                    yield _strip_address_type(recipient), SuppressedEmail.REASON_COMPLAINT
+
+
+def parse_mbox(path):
+    for message in mailbox.mbox(path, create=False):
+        for event in parse_message(message):
+            yield event
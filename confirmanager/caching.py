@@ -0,0 +1,67 @@
+# coding: utf-8
+""" Opt-in cache for ``EmailConfirmationManager.last_email_for``,
+    enabled by setting CONFIRMANAGER_CACHE to a cache alias.
+
+    Only the pending email is cached, confirmed email is read from
+    the user object.
+
+    Every user has a version key, cached values are stored under the
+    version read *before* they were computed, so invalidation (a new
+    version) can not be overwritten by a concurrent stale value.
+
+    Invalidation can still run before the surrounding transaction commits
+    (TransactionMiddleware, ATOMIC_REQUESTS), so a concurrent request may
+    cache the old state under the new version. Every value therefore
+    lives at most CONFIRMANAGER_CACHE_TIMEOUT seconds.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import get_cache
+
+
+VERSION_TIMEOUT = 60 * 60 * 24 * 30  # memcached maximum
+DEFAULT_TIMEOUT = 5 * 60
+
+
+def get_confirmation_cache():
+    alias = getattr(settings, 'CONFIRMANAGER_CACHE', None)
+    return get_cache(alias) if alias else None
+
+
+def _version_key(user_pk):
+    return 'confirmanager:last_email:%s' % user_pk
+
+
+def _value_key(user_pk, version):
+    return 'confirmanager:last_email:%s:%s' % (user_pk, version)
+
+
+def get_last_email(user_pk):
+    """ Returns ``(version, cached value or None)`` """
+    cache = get_confirmation_cache()
+    if cache is None:
+        return None, None
+    version = cache.get(_version_key(user_pk))
+    if version is None:
+        return invalidate_last_email(user_pk), None
+    return version, cache.get(_value_key(user_pk, version))
+
+
+def set_last_email(user_pk, version, value, timeout=None):
+    """ ``timeout`` is capped by CONFIRMANAGER_CACHE_TIMEOUT """
+    cache = get_confirmation_cache()
+    if cache is None or version is None:
+        return
+    max_timeout = getattr(settings, 'CONFIRMANAGER_CACHE_TIMEOUT', DEFAULT_TIMEOUT)
+    timeout = min(timeout, max_timeout) if timeout else max_timeout
+    cache.set(_value_key(user_pk, version), value, timeout)
+
+
+def invalidate_last_email(user_pk):
+    cache = get_confirmation_cache()
+    if cache is None:
+        return None
+    version = uuid.uuid4().hex
+    cache.set(_version_key(user_pk), version, VERSION_TIMEOUT)
+    return version
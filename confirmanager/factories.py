@@ -1,7 +1,6 @@
 # coding: utf-8
 import datetime
 import random
-import string
 
 from django.contrib.auth.models import User
 import factory
@@ -18,7 +17,7 @@ class UserFactory(factory.DjangoModelFactory):
 class ConfirmationFactory(factory.DjangoModelFactory):
     FACTORY_FOR = EmailConfirmation
     user = factory.SubFactory(UserFactory)
-    confirmation_key = factory.LazyAttribute(lambda _: ''.join(random.choice(string.digits) for x in range(10)))
+    confirmation_key = factory.LazyAttribute(lambda _: '%040x' % random.getrandbits(160))
     sent_on = factory.LazyAttribute(lambda _: datetime.datetime.now())
 
     @factory.post_generation
@@ -0,0 +1,74 @@
+# coding: utf-8
+import binascii
+import re
+
+from django.db import models
+from django.utils import six
+
+try:
+    Binary = buffer
+    binary_types = (buffer, bytearray)
+except NameError:  # python 3
+    Binary = memoryview
+    binary_types = (bytes, bytearray, memoryview)
+
+
+KEY_LENGTH = 20  # sha1 digest
+HEX_KEY_RE = re.compile(r'^[0-9a-fA-F]{%d}\Z' % (KEY_LENGTH * 2))
+
+
+class ConfirmationKeyField(six.with_metaclass(models.SubfieldBase, models.Field)):
+    """ Stores sha1 hexdigest as fixed-width binary column, half the size
+        of a hex CharField (and of any index on it).
+        Python value is still a lowercase hex string.
+    """
+    description = "SHA1 digest stored as binary"
+
+    def db_type(self, connection):
+        return {
+            'postgresql': 'bytea',
+            'mysql': 'binary(%d)' % KEY_LENGTH,
+            'oracle': 'raw(%d)' % KEY_LENGTH,
+        }.get(connection.vendor, 'blob')
+
+    def to_python(self, value):
+        """ Raw digest from the database or hex string -> lowercase hex string.
+            Raises ValueError for anything else, except empty string (unsaved default).
+        """
+        if value is None or value == '':
+            return value
+        # MySQLdb returns binary columns as str on python 2
+        from_db = isinstance(value, binary_types) or (not six.PY3 and isinstance(value, bytes))
+        if from_db and len(value) == KEY_LENGTH:
+            return binascii.hexlify(bytes(value)).decode('ascii')
+        return self.to_hex(value)
+
+    def to_hex(self, value):
+        if not isinstance(value, six.string_types) or not HEX_KEY_RE.match(value):
+            raise ValueError('Confirmation key must be %d hex digits' % (KEY_LENGTH * 2))
+        return value.lower()
+
+    def get_prep_value(self, value):
+        """ Lookups take 40 hex digits only, never raw 20-char strings """
+        if value is None:
+            return value
+        if isinstance(value, binary_types) and len(value) == KEY_LENGTH:
+            return bytes(value)
+        return binascii.unhexlify(self.to_hex(value).encode('ascii'))
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if not prepared:
+            value = self.get_prep_value(value)
+        if value is None:
+            return value
+        return Binary(value)
+
+    def value_to_string(self, obj):
+        return self._get_val_from_obj(obj)
+
+
+try:
+    from south.modelsinspector import add_introspection_rules
+    add_introspection_rules([], [r'^confirmanager\.fields\.ConfirmationKeyField'])
+except ImportError:
+    pass
@@ -0,0 +1,70 @@
+# coding: utf-8
+import csv
+import datetime
+import json
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.encoding import smart_str
+
+from confirmanager.models import EmailConfirmation, EXPORT_FIELDS
+
+
+def parse_date(value):
+    try:
+        return datetime.datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        raise CommandError('Dates should be in YYYY-MM-DD format, got %s' % value)
+
+
+def to_json(value):
+    return value.isoformat() if isinstance(value, datetime.datetime) else value
+
+
+class Command(BaseCommand):
+    help = 'Confirmation funnel stats or raw rows export'
+    option_list = BaseCommand.option_list + (
+        make_option('--bucket', dest='bucket', default='day', choices=('day', 'month', 'year'),
+                    help='Group stats by day, month or year of sending'),
+        make_option('--since', dest='since', help='YYYY-MM-DD, inclusive'),
+        make_option('--until', dest='until', help='YYYY-MM-DD, exclusive'),
+        make_option('--export', dest='export', choices=('csv', 'jsonl'),
+                    help='Stream raw rows instead of stats'),
+        make_option('--output', dest='output', help='Write to file instead of stdout'),
+        make_option('--chunk-size', dest='chunk_size', type='int', default=1000,
+                    help='Rows fetched per query during export'),
+    )
+
+    def handle(self, *args, **options):
+        since = parse_date(options['since']) if options['since'] else None
+        until = parse_date(options['until']) if options['until'] else None
+        output = open(options['output'], 'w') if options['output'] else self.stdout
+        try:
+            if options['export']:
+                rows = EmailConfirmation.objects.export_rows(since=since, until=until,
+                                                             chunk_size=options['chunk_size'])
+                getattr(self, 'export_%s' % options['export'])(output, rows)
+            else:
+                stats = EmailConfirmation.objects.funnel_stats(kind=options['bucket'], since=since, until=until)
+                self.write_stats(output, stats)
+        finally:
+            if output is not self.stdout:
+                output.close()
+
+    def export_csv(self, output, rows):
+        writer = csv.writer(output)
+        writer.writerow(EXPORT_FIELDS)
+        for row in rows:
+            writer.writerow([smart_str(value) if value is not None else '' for value in row])
+
+    def export_jsonl(self, output, rows):
+        for row in rows:
+            output.write(json.dumps(dict(zip(EXPORT_FIELDS, map(to_json, row)))) + '\n')
+
+    def write_stats(self, output, stats):
+        output.write('bucket\tsent\tconfirmed\texpired\tsuperseded\tbounced\tresent\n')
+        for bucket in stats['buckets']:
+            output.write('%(bucket)s\t%(sent)d\t%(confirmed)d\t%(expired)d\t%(superseded)d\t%(bounced)d\t%(resent)d\n'
+                         % bucket)
+        for percentile, seconds in sorted(stats['time_to_confirm'].items()):
+            output.write('time to confirm p%d: %s\n' % (percentile, '-' if seconds is None else '%ds' % seconds))
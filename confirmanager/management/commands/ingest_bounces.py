@@ -0,0 +1,31 @@
+# coding: utf-8
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+
+from confirmanager.bounces import parse_json_dump, parse_mbox
+from confirmanager.models import SuppressedEmail
+
+
+class Command(BaseCommand):
+    args = '<path path ...>'
+    help = 'Suppresses bounced/complained addresses found in mbox or JSON dumps'
+    option_list = BaseCommand.option_list + (
+        make_option('--format', dest='format', default='mbox', choices=('mbox', 'json'),
+                    help='Dump format: mbox (DSN/ARF reports) or json (provider events)'),
+    )
+
+    def handle(self, *paths, **options):
+        if not paths:
+            raise CommandError('At least one path is required')
+        for path in paths:
+            try:
+                if options['format'] == 'json':
+                    with open(path) as dump:
+                        events = parse_json_dump(dump)
+                else:
+                    events = list(parse_mbox(path))
+            except (IOError, ValueError) as e:
+                raise CommandError('%s: %s' % (path, e))
+            suppressed = SuppressedEmail.objects.suppress(events)
+            self.stdout.write('%s: %d addresses suppressed\n' % (path, suppressed))
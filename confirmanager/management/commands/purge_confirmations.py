@@ -0,0 +1,20 @@
+# coding: utf-8
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+
+from confirmanager.models import EmailConfirmation
+
+
+class Command(BaseCommand):
+    help = 'Archives expired confirmations and deletes archived ones older than retention period'
+    option_list = BaseCommand.option_list + (
+        make_option('--days', dest='days', type='int',
+                    help='Keep archived confirmations sent within this many days '
+                         '(default CONFIRMANAGER_KEEP_ARCHIVED or 90)'),
+    )
+
+    def handle(self, *args, **options):
+        EmailConfirmation.objects.archive_expired_confirmations()
+        deleted = EmailConfirmation.objects.purge_archived_confirmations(days=options['days'])
+        self.stdout.write('%d archived confirmations deleted\n' % deleted)
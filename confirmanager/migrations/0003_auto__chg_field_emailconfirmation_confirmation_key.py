@@ -0,0 +1,136 @@
+# encoding: utf-8
+import binascii
+import datetime
+from south.db import db
+from south.v2 import SchemaMigration
+from django.db import connection, models
+
+from confirmanager.fields import Binary
+
+TABLE = 'confirmanager_emailconfirmation'
+CHUNK_SIZE = 1000
+
+
+def convert_keys(source, target, convert):
+    """ Copies keys from source to target column in chunks, rows with keys that
+        can not be converted (not a sha1 hexdigest) are deleted,
+        their links would not work anyway.
+    """
+    cursor = connection.cursor()
+    last_pk = 0
+    while True:
+        cursor.execute('SELECT id, %s FROM %s WHERE id > %%s ORDER BY id LIMIT %d'
+                       % (db.quote_name(source), TABLE, CHUNK_SIZE), [last_pk])
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        last_pk = rows[-1][0]
+        converted, broken = [], []
+        for pk, key in rows:
+            try:
+                converted.append((convert(key), pk))
+            except (TypeError, ValueError, binascii.Error):
+                broken.append((pk,))
+        if converted:
+            cursor.executemany('UPDATE %s SET %s = %%s WHERE id = %%s' % (TABLE, db.quote_name(target)), converted)
+        if broken:
+            cursor.executemany('DELETE FROM %s WHERE id = %%s' % TABLE, broken)
+
+
+def hex_to_binary(key):
+    if len(key) != 40:
+        raise ValueError(key)
+    return Binary(binascii.unhexlify(key.lower().encode('ascii')))
+
+
+def binary_to_hex(key):
+    return binascii.hexlify(bytes(key)).decode('ascii')
+
+
+class Migration(SchemaMigration):
+
+    def forwards(self, orm):
+        
+        # Converting 'EmailConfirmation.confirmation_key' to binary
+        db.add_column(TABLE, 'confirmation_key_bin', self.gf('confirmanager.fields.ConfirmationKeyField')(null=True), keep_default=False)
+        if not db.dry_run:
+            convert_keys('confirmation_key', 'confirmation_key_bin', hex_to_binary)
+        db.delete_column(TABLE, 'confirmation_key')
+        db.rename_column(TABLE, 'confirmation_key_bin', 'confirmation_key')
+        db.alter_column(TABLE, 'confirmation_key', self.gf('confirmanager.fields.ConfirmationKeyField')())
+
+        # Adding index on 'EmailConfirmation', fields ['confirmation_key']
+        db.create_index(TABLE, ['confirmation_key'])
+
+
+    def backwards(self, orm):
+        
+        # Removing index on 'EmailConfirmation', fields ['confirmation_key']
+        db.delete_index(TABLE, ['confirmation_key'])
+
+        # Converting 'EmailConfirmation.confirmation_key' back to hex
+        db.add_column(TABLE, 'confirmation_key_hex', self.gf('django.db.models.fields.CharField')(max_length=40, null=True), keep_default=False)
+        if not db.dry_run:
+            convert_keys('confirmation_key', 'confirmation_key_hex', binary_to_hex)
+        db.delete_column(TABLE, 'confirmation_key')
+        db.rename_column(TABLE, 'confirmation_key_hex', 'confirmation_key')
+        db.alter_column(TABLE, 'confirmation_key', self.gf('django.db.models.fields.CharField')(max_length=40))
+
+
+    models = {
+        'auth.group': {
+            'Meta': {'object_name': 'Group'},
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'name': ('django.db.models.fields.CharField', [], {'unique': 'True', 'max_length': '80'}),
+            'permissions': ('django.db.models.fields.related.ManyToManyField', [], {'to': "orm['auth.Permission']", 'symmetrical': 'False', 'blank': 'True'})
+        },
+        'auth.permission': {
+            'Meta': {'ordering': "('content_type__app_label', 'content_type__model', 'codename')", 'unique_together': "(('content_type', 'codename'),)", 'object_name': 'Permission'},
+            'codename': ('django.db.models.fields.CharField', [], {'max_length': '100'}),
+            'content_type': ('django.db.models.fields.related.ForeignKey', [], {'to': "orm['contenttypes.ContentType']"}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'name': ('django.db.models.fields.CharField', [], {'max_length': '50'})
+        },
+        'auth.user': {
+            'Meta': {'object_name': 'User'},
+            'date_joined': ('django.db.models.fields.DateTimeField', [], {'default': 'datetime.datetime(2013, 3, 14, 17, 7, 38, 987663)'}),
+            'email': ('django.db.models.fields.EmailField', [], {'max_length': '75', 'blank': 'True'}),
+            'first_name': ('django.db.models.fields.CharField', [], {'max_length': '30', 'blank': 'True'}),
+            'groups': ('django.db.models.fields.related.ManyToManyField', [], {'to': "orm['auth.Group']", 'symmetrical': 'False', 'blank': 'True'}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'is_active': ('django.db.models.fields.BooleanField', [], {'default': 'True'}),
+            'is_staff': ('django.db.models.fields.BooleanField', [], {'default': 'False'}),
+            'is_superuser': ('django.db.models.fields.BooleanField', [], {'default': 'False'}),
+            'last_login': ('django.db.models.fields.DateTimeField', [], {'default': 'datetime.datetime(2013, 3, 14, 17, 7, 38, 987502)'}),
+            'last_name': ('django.db.models.fields.CharField', [], {'max_length': '30', 'blank': 'True'}),
+            'password': ('django.db.models.fields.CharField', [], {'max_length': '128'}),
+            'user_permissions': ('django.db.models.fields.related.ManyToManyField', [], {'to': "orm['auth.Permission']", 'symmetrical': 'False', 'blank': 'True'}),
+            'username': ('django.db.models.fields.CharField', [], {'unique': 'True', 'max_length': '30'})
+        },
+        'confirmanager.emailconfirmation': {
+            'Meta': {'ordering': "('-sent_on',)", 'object_name': 'EmailConfirmation'},
+            'confirmation_key': ('confirmanager.fields.ConfirmationKeyField', [], {'db_index': 'True'}),
+            'email': ('django.db.models.fields.EmailField', [], {'max_length': '254'}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'is_bounced': ('django.db.models.fields.BooleanField', [], {'default': 'False'}),
+            'is_verified': ('django.db.models.fields.BooleanField', [], {'default': 'False'}),
+            'sent_on': ('django.db.models.fields.DateTimeField', [], {}),
+            'user': ('django.db.models.fields.related.ForeignKey', [], {'to': "orm['auth.User']"})
+        },
+        'confirmanager.suppressedemail': {
+            'Meta': {'object_name': 'SuppressedEmail'},
+            'created_on': ('django.db.models.fields.DateTimeField', [], {}),
+            'email': ('django.db.models.fields.EmailField', [], {'unique': 'True', 'max_length': '254'}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'reason': ('django.db.models.fields.CharField', [], {'default': "'bounce'", 'max_length': '20'})
+        },
+        'contenttypes.contenttype': {
+            'Meta': {'ordering': "('name',)", 'unique_together': "(('app_label', 'model'),)", 'object_name': 'ContentType', 'db_table': "'django_content_type'"},
+            'app_label': ('django.db.models.fields.CharField', [], {'max_length': '100'}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'model': ('django.db.models.fields.CharField', [], {'max_length': '100'}),
+            'name': ('django.db.models.fields.CharField', [], {'max_length': '100'})
+        }
+    }
+
+    complete_apps = ['confirmanager']
@@ -1,14 +1,16 @@
 # coding: utf-8
 import datetime
+import math
 from random import random
 from hashlib import sha1
 
 from django.conf import settings
 from django.contrib.auth.models import User
 from django.core.urlresolvers import reverse
-from django.db import models, transaction
+from django.db import connection, models, transaction, IntegrityError
+from django.db.models import Count
 from django.utils.translation import gettext_lazy as _
-from confirmanager.utils import get_class, get_current_domain
+from confirmanager.utils import get_class, get_current_domain, encode_key, savepoint
 
 try:
     from django.utils.timezone import now
@@ -16,6 +18,8 @@ except ImportError:
     now = datetime.datetime.now
 from templated_email import send_templated_mail
 
+from . import caching
+from .fields import ConfirmationKeyField
 from .signals import email_confirmed
 
 
@@ -27,12 +31,110 @@ class ConfirmationAlreadyVerified(Exception):
     pass
 
 
+class EmailSuppressed(Exception):
+    pass
+
+
+def normalize_email(email):
+    return email.strip().lower()
+
+
+class SuppressedEmailManager(models.Manager):
+
+    def is_suppressed(self, email):
+        return self.filter(email=normalize_email(email)).exists()
+
+    def suppress(self, events):
+        """ Bulk-marks addresses as bounced, ``events`` is an iterable of
+            ``(email, reason)`` pairs. Returns number of newly suppressed addresses.
+        """
+        reasons = {}
+        for email, reason in events:
+            email = normalize_email(email)
+            # complaint is the stronger reason
+            if email not in reasons or reason == self.model.REASON_COMPLAINT:
+                reasons[email] = reason
+        reasons.pop('', None)
+        if not reasons:
+            return 0
+
+        created = 0
+        emails = list(reasons)
+        chunk_size = getattr(settings, 'CONFIRMANAGER_BOUNCE_CHUNK_SIZE', 500)
+        with transaction.commit_on_success():
+            for start in range(0, len(emails), chunk_size):
+                chunk = emails[start:start + chunk_size]
+                known = set(self.filter(email__in=chunk).values_list('email', flat=True))
+                missing = [email for email in chunk if email not in known]
+                complained = [email for email in known if reasons[email] == self.model.REASON_COMPLAINT]
+                if complained:
+                    (self.filter(email__in=complained, reason=self.model.REASON_BOUNCE)
+                         .update(reason=self.model.REASON_COMPLAINT))
+                try:
+                    with savepoint():
+                        self.bulk_create([self.model(email=email, reason=reasons[email], created_on=now())
+                                          for email in missing])
+                except IntegrityError:
+                    # concurrent batch inserted some of the same addresses
+                    for email in missing:
+                        _, is_created = self.get_or_create(email=email, defaults={'reason': reasons[email],
+                                                                                  'created_on': now()})
+                        created += is_created
+                else:
+                    created += len(missing)
+                (EmailConfirmation.objects.filter(normalized_email__in=chunk, is_bounced=False)
+                                          .update(is_bounced=True))
+        return created
+
+
+class SuppressedEmail(models.Model):
+    REASON_BOUNCE = 'bounce'
+    REASON_COMPLAINT = 'complaint'
+    REASON_CHOICES = (
+        (REASON_BOUNCE, _("bounce")),
+        (REASON_COMPLAINT, _("complaint")),
+    )
+
+    email = models.EmailField(max_length=254, unique=True)
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES, default=REASON_BOUNCE)
+    created_on = models.DateTimeField()
+
+    objects = SuppressedEmailManager()
+
+    def __unicode__(self):
+        return self.__repr__()
+
+    def __repr__(self):
+        return "SuppressedEmail <{0}> ({1})".format(self.email, self.reason)
+
+    class Meta:
+        verbose_name = _("suppressed e-mail")
+        verbose_name_plural = _("suppressed e-mails")
+
+
+def bucket_date(value):
+    """ date_trunc_sql gives strings, dates or datetimes depending on backend """
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    return datetime.datetime.strptime(value[:10], '%Y-%m-%d').date()
+
+
+EXPORT_FIELDS = ('id', 'user_id', 'email', 'sent_on', 'is_verified', 'is_bounced', 'is_resend', 'time_to_confirm',
+                 'archived_reason')
+
+
 class EmailConfirmationManager(models.Manager):
 
+    def active(self):
+        """ Confirmations that were not archived, archived ones are only kept for stats """
+        return self.filter(archived_reason='')
+
     def confirm(self, confirmation_key):
         try:
-            confirmation = self.get(confirmation_key=confirmation_key)
-        except self.model.DoesNotExist:
+            confirmation = self.active().get(confirmation_key=confirmation_key)
+        except (self.model.DoesNotExist, ValueError):  # ValueError for malformed keys
             return None
         if confirmation.is_verified:  # double activation
             raise ConfirmationAlreadyVerified
@@ -51,23 +153,45 @@ class EmailConfirmationManager(models.Manager):
                 confirmation.user.email = confirmation.email
                 confirmation.user.save()
                 confirmation.is_verified = True
+                confirmed_in = now() - confirmation.sent_on
+                confirmation.time_to_confirm = max(confirmed_in.days * 24 * 60 * 60 + confirmed_in.seconds, 0)
                 confirmation.save()
                 email_confirmed.send(sender=self.model, email=confirmation.email, previous_email=previous_email)
-                self.delete_other_user_confirmations(user=confirmation.user)
-                return confirmation
+                self.archive_other_user_confirmations(user=confirmation.user)
+            # readers could have cached the state that was not committed yet
+            caching.invalidate_last_email(confirmation.user.pk)
+            return confirmation
 
     def last_email_for(self, user):
-        confirmations = self.filter(user=user, is_verified=False)
-        last_unconfirmed = next((c.email for c in confirmations if not c.is_key_expired), None)
-        if last_unconfirmed:
-            return last_unconfirmed, False
+        # only the pending email is cached ('' if there is none), confirmed
+        # email comes from the user object, it can change outside confirmanager
+        version, pending_email = caching.get_last_email(user.pk)
+        if pending_email is None:
+            confirmations = self.active().filter(user=user, is_verified=False)
+            last_unconfirmed = next((c for c in confirmations if not c.is_key_expired), None)
+            if last_unconfirmed:
+                # pending state is cached no longer than the confirmation lives
+                expires_in = last_unconfirmed.expires_on - now()
+                timeout = max(expires_in.days * 24 * 60 * 60 + expires_in.seconds, 1)
+                pending_email = last_unconfirmed.email
+            else:
+                timeout = None
+                pending_email = ''
+            caching.set_last_email(user.pk, version, pending_email, timeout)
+        if pending_email:
+            return pending_email, False
         else:
             return user.email, True
 
-    def send_confirmation(self, email, user):
+    def send_confirmation(self, email, user, is_resend=False):
+        if SuppressedEmail.objects.is_suppressed(email):
+            raise EmailSuppressed
         confirmation_key = self.get_confirmation_key(email)
         self.send_email(email, user, confirmation_key)
-        return self.create(email=email, user=user, sent_on=now(), confirmation_key=confirmation_key)
+        confirmation = self.create(email=email, user=user, sent_on=now(), confirmation_key=confirmation_key,
+                                   is_resend=is_resend)
+        caching.invalidate_last_email(user.pk)
+        return confirmation
 
     def get_confirmation_key(self, email):
         salt = sha1(str(random())).hexdigest()[:5]
@@ -91,31 +215,146 @@ class EmailConfirmationManager(models.Manager):
                                    context=self.get_context(confirmation_key, user))
 
     def get_confirmation_url(self, confirmation_key):
-        return reverse('confirmation-view', args=[confirmation_key])
+        return reverse('confirmation-view', args=[encode_key(confirmation_key)])
+
+    def expiration_cutoff(self):
+        """ Confirmations sent before this moment are expired """
+        return now() - datetime.timedelta(days=getattr(settings, 'CONFIRMANAGER_EXPIRES', 3))
+
+    def archive_expired_confirmations(self):
+        """ Hides expired confirmations but keeps them for ``funnel_stats`` """
+        (self.active().filter(sent_on__lte=self.expiration_cutoff())
+                      .update(archived_reason=self.model.ARCHIVED_EXPIRED))
+
+    def archive_other_user_confirmations(self, user):
+        """ Hides unverified confirmations superseded by a confirmed one """
+        (self.active().filter(user=user, is_verified=False)
+                      .update(archived_reason=self.model.ARCHIVED_SUPERSEDED))
+        caching.invalidate_last_email(user.pk)
+
+    def purge_archived_confirmations(self, days=None):
+        """ Deletes archived confirmations sent more than ``days`` ago
+            (CONFIRMANAGER_KEEP_ARCHIVED, 90 by default), returns how many
+        """
+        if days is None:
+            days = getattr(settings, 'CONFIRMANAGER_KEEP_ARCHIVED', 90)
+        archived = (self.exclude(archived_reason='')
+                        .filter(sent_on__lt=now() - datetime.timedelta(days=days)))
+        count = archived.count()
+        archived.delete()
+        return count
 
     def delete_expired_confirmations(self):
-        for confirmation in self.all():
-            if confirmation.is_key_expired:
-                confirmation.delete()
+        self.filter(sent_on__lte=self.expiration_cutoff()).delete()
 
     def delete_other_user_confirmations(self, user):
         self.filter(user=user, is_verified=False).delete()
+        caching.invalidate_last_email(user.pk)
+
+    def sent_between(self, since=None, until=None):
+        queryset = self.all()
+        if since:
+            queryset = queryset.filter(sent_on__gte=since)
+        if until:
+            queryset = queryset.filter(sent_on__lt=until)
+        return queryset
+
+    def funnel_stats(self, kind='day', since=None, until=None, percentiles=(50, 90, 99)):
+        """ Sent/confirmed/expired/superseded/bounced/resent counts grouped by ``kind``
+            ('day', 'month' or 'year', bucket is the first date) of sending and time to confirm
+            percentiles (seconds) for the whole period.
+            Archived confirmations are counted too, superseded ones (user confirmed
+            another address) are not counted as expired.
+        """
+        queryset = self.sent_between(since, until)
+
+        cutoff = self.expiration_cutoff()
+        bucket_sql = connection.ops.date_trunc_sql(kind, '%s.%s' % (connection.ops.quote_name(self.model._meta.db_table),
+                                                                    connection.ops.quote_name('sent_on')))
+        counters = (
+            ('sent', queryset),
+            ('confirmed', queryset.filter(is_verified=True)),
+            ('expired', queryset.filter(is_verified=False, sent_on__lte=cutoff)
+                                .exclude(archived_reason=self.model.ARCHIVED_SUPERSEDED)),
+            ('superseded', queryset.filter(archived_reason=self.model.ARCHIVED_SUPERSEDED)),
+            ('bounced', queryset.filter(is_bounced=True)),
+            ('resent', queryset.filter(is_resend=True)),
+        )
+        buckets = {}
+        for name, counter_queryset in counters:
+            grouped = (counter_queryset.extra(select={'bucket': bucket_sql})
+                                       .values('bucket').annotate(count=Count('pk')).order_by('bucket'))
+            for row in grouped:
+                bucket = buckets.setdefault(bucket_date(row['bucket']), dict.fromkeys(dict(counters), 0))
+                bucket[name] = row['count']
+
+        confirmed = (queryset.filter(time_to_confirm__isnull=False)
+                             .order_by('time_to_confirm').values_list('time_to_confirm', flat=True))
+        confirmed_count = confirmed.count()
+        time_to_confirm = {}
+        for percentile in percentiles:
+            if confirmed_count:
+                # nearest-rank, one indexed LIMIT 1 OFFSET n query per percentile
+                rank = max(int(math.ceil(percentile / 100.0 * confirmed_count)) - 1, 0)
+                time_to_confirm[percentile] = confirmed[min(rank, confirmed_count - 1)]
+            else:
+                time_to_confirm[percentile] = None
+
+        return {
+            'buckets': [dict(bucket=key, **buckets[key]) for key in sorted(buckets)],
+            'time_to_confirm': time_to_confirm,
+        }
+
+    def export_rows(self, fields=EXPORT_FIELDS, since=None, until=None, chunk_size=1000):
+        """ Yields ``fields`` tuples for every confirmation ordered by pk.
+            Rows are fetched in keyset-paginated chunks, memory use does not
+            depend on table size.
+        """
+        queryset = self.sent_between(since, until)
+        queryset = queryset.order_by('pk').values_list('pk', *fields)
+        last_pk = None
+        while True:
+            chunk = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+            rows = list(chunk[:chunk_size].iterator())
+            if not rows:
+                break
+            last_pk = rows[-1][0]
+            for row in rows:
+                yield row[1:]
 
 
 class EmailConfirmation(models.Model):
+    ARCHIVED_EXPIRED = 'expired'
+    ARCHIVED_SUPERSEDED = 'superseded'
+    ARCHIVED_CHOICES = (
+        (ARCHIVED_EXPIRED, _("expired")),
+        (ARCHIVED_SUPERSEDED, _("superseded")),
+    )
+
     user = models.ForeignKey(getattr(settings, 'AUTH_USER_MODEL', User))
     email = models.EmailField(max_length=254)
+    normalized_email = models.CharField(max_length=254, db_index=True, editable=False)  # for suppression
     sent_on = models.DateTimeField()
-    confirmation_key = models.CharField(max_length=40)
+    confirmation_key = ConfirmationKeyField(db_index=True)
     is_verified = models.BooleanField(default=False)
+    is_bounced = models.BooleanField(default=False)
+    is_resend = models.BooleanField(default=False)
+    time_to_confirm = models.PositiveIntegerField(null=True, blank=True, db_index=True)  # seconds
+    archived_reason = models.CharField(max_length=20, blank=True, choices=ARCHIVED_CHOICES)
 
     objects = EmailConfirmationManager()
 
+    def save(self, *args, **kwargs):
+        self.normalized_email = normalize_email(self.email)
+        super(EmailConfirmation, self).save(*args, **kwargs)
+
+    @property
+    def expires_on(self):
+        return self.sent_on + datetime.timedelta(days=getattr(settings, 'CONFIRMANAGER_EXPIRES', 3))
+
     @property
     def is_key_expired(self):
-        confirm_timedelta = datetime.timedelta(days=getattr(settings, 'CONFIRMANAGER_EXPIRES', 3))
-        expiration_date = self.sent_on + confirm_timedelta
-        return expiration_date <= now()
+        return self.expires_on <= now()
 
     def __unicode__(self):
         return self.__repr__()
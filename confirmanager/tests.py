@@ -1,14 +1,25 @@
 # coding: utf-8
 import datetime
+import email
+import json
+import os
+import tempfile
 from mock import patch, ANY
 
+from django.core.cache import get_cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.core.urlresolvers import reverse
 from django.test.utils import override_settings
 from django.test import TestCase
 from django.contrib.auth.models import User
+from django.utils import six
 
-from .utils import mock_signal_receiver
-from .models import EmailConfirmation, ConfirmationExpired, ConfirmationAlreadyVerified
+from .bounces import parse_events, parse_json_dump, parse_message
+from .management.commands.confirmation_stats import parse_date
+from .utils import mock_signal_receiver, encode_key, decode_key
+from .models import (EmailConfirmation, SuppressedEmail, ConfirmationExpired, ConfirmationAlreadyVerified,
+                     EmailSuppressed, EXPORT_FIELDS)
 from .signals import email_confirmed
 from .factories import ConfirmationFactory, UserFactory
 
@@ -28,6 +39,29 @@ class TestModel(TestCase):
         self.assertFalse(not_expired.is_key_expired)
 
 
+class TestConfirmationKey(TestCase):
+
+    def test_key_roundtrip(self):
+        key = 'da39a3ee5e6b4b0d3255bfef95601890afd80709'
+        confirmation = ConfirmationFactory(confirmation_key=key.upper())
+        self.assertEqual(EmailConfirmation.objects.get(confirmation_key=key).pk, confirmation.pk)
+        self.assertEqual(EmailConfirmation.objects.get(pk=confirmation.pk).confirmation_key, key)
+
+    def test_malformed_lookups(self):
+        ConfirmationFactory()
+        for key in ('a' * 20, 'z' * 40, 'a' * 40 + '\n', 123, ['a' * 40]):
+            self.assertEqual(EmailConfirmation.objects.confirm(key), None)
+            self.assertRaises(ValueError, EmailConfirmation.objects.filter, confirmation_key=key)
+
+    def test_codec(self):
+        key = 'da39a3ee5e6b4b0d3255bfef95601890afd80709'
+        self.assertEqual(encode_key(key), '2jmj7l5rSw0yVb_vlWAYkK_YBwk')
+        self.assertEqual(decode_key('2jmj7l5rSw0yVb_vlWAYkK_YBwk'), key)
+        self.assertEqual(decode_key(key.upper()), key)
+        self.assertRaises(ValueError, decode_key, 'xxx')
+        self.assertRaises(ValueError, decode_key, '!' * 27)
+
+
 @override_settings(CONFIRMANAGER_EXPIRES=3)
 class TestManager(TestCase):
 
@@ -41,6 +75,101 @@ class TestManager(TestCase):
                                  ['EmailConfirmation for <baz@bar.com> (unverified)'])
 
 
+@patch('confirmanager.models.now')
+@override_settings(CONFIRMANAGER_EXPIRES=3)
+class TestStats(TestCase):
+
+    def setUp(self):
+        ConfirmationFactory(sent_on=datetime.datetime(2013, 3, 1, 10), is_verified=True, time_to_confirm=60)
+        ConfirmationFactory(sent_on=datetime.datetime(2013, 3, 1, 12), is_verified=True, time_to_confirm=600)
+        ConfirmationFactory(sent_on=datetime.datetime(2013, 3, 1, 15))
+        ConfirmationFactory(sent_on=datetime.datetime(2013, 3, 9), is_resend=True)
+
+    def test_funnel_stats(self, mock_now):
+        mock_now.return_value = datetime.datetime(2013, 3, 10)
+        stats = EmailConfirmation.objects.funnel_stats(percentiles=(50, 100))
+        self.assertEqual([(b['bucket'], b['sent'], b['confirmed'], b['expired'], b['resent'])
+                          for b in stats['buckets']],
+                         [(datetime.date(2013, 3, 1), 3, 2, 1, 0), (datetime.date(2013, 3, 9), 1, 0, 0, 1)])
+        self.assertEqual(stats['time_to_confirm'], {50: 60, 100: 600})
+
+    def test_export_rows(self, mock_now):
+        rows = list(EmailConfirmation.objects.export_rows(fields=('time_to_confirm',), chunk_size=3,
+                                                          since=datetime.datetime(2013, 3, 1, 11)))
+        self.assertEqual(rows, [(600,), (None,), (None,)])
+
+    def archive_all(self):
+        EmailConfirmation.objects.archive_expired_confirmations()
+        for user in User.objects.all():
+            EmailConfirmation.objects.archive_other_user_confirmations(user)
+        self.assertEqual(EmailConfirmation.objects.active().count(), 0)
+
+    def test_archived_are_counted(self, mock_now):
+        mock_now.return_value = datetime.datetime(2013, 3, 10)
+        self.archive_all()
+        stats = EmailConfirmation.objects.funnel_stats()
+        self.assertEqual([(b['sent'], b['confirmed'], b['expired'], b['superseded'], b['resent'])
+                          for b in stats['buckets']],
+                         [(3, 2, 1, 0, 0), (1, 0, 0, 1, 1)])
+
+    def test_superseded_are_not_expired(self, mock_now):
+        mock_now.return_value = datetime.datetime(2013, 3, 10)
+        self.archive_all()
+        mock_now.return_value = datetime.datetime(2013, 3, 20)
+        stats = EmailConfirmation.objects.funnel_stats()
+        self.assertEqual([(b['expired'], b['superseded']) for b in stats['buckets']], [(1, 0), (0, 1)])
+
+    def test_purge_archived(self, mock_now):
+        mock_now.return_value = datetime.datetime(2013, 3, 10)
+        self.archive_all()
+        self.assertEqual(EmailConfirmation.objects.purge_archived_confirmations(days=5), 3)
+        self.assertEqual(EmailConfirmation.objects.count(), 1)
+
+    def test_purge_command(self, mock_now):
+        mock_now.return_value = datetime.datetime(2013, 3, 10)
+        call_command('purge_confirmations', days=5, stdout=six.StringIO())
+        # 3/9 is neither expired nor superseded, archived ones sent on 3/1 are gone
+        self.assertEqual(list(EmailConfirmation.objects.values_list('sent_on', flat=True)),
+                         [datetime.datetime(2013, 3, 9)])
+
+    def call(self, *args, **options):
+        stdout = six.StringIO()
+        call_command('confirmation_stats', *args, stdout=stdout, **options)
+        return stdout.getvalue().splitlines()
+
+    def test_command_stats(self, mock_now):
+        mock_now.return_value = datetime.datetime(2013, 3, 10)
+        self.assertEqual(self.call(), ['bucket\tsent\tconfirmed\texpired\tsuperseded\tbounced\tresent',
+                                       '2013-03-01\t3\t2\t1\t0\t0\t0',
+                                       '2013-03-09\t1\t0\t0\t0\t0\t1',
+                                       'time to confirm p50: 60s',
+                                       'time to confirm p90: 600s',
+                                       'time to confirm p99: 600s'])
+
+    def test_command_stats_period(self, mock_now):
+        mock_now.return_value = datetime.datetime(2013, 3, 10)
+        self.assertEqual(self.call(since='2013-03-02', until='2013-03-10', bucket='month'),
+                         ['bucket\tsent\tconfirmed\texpired\tsuperseded\tbounced\tresent',
+                          '2013-03-01\t1\t0\t0\t0\t0\t1',
+                          'time to confirm p50: -',
+                          'time to confirm p90: -',
+                          'time to confirm p99: -'])
+        self.assertRaises(CommandError, parse_date, '01.03.2013')
+
+    def test_command_export_csv(self, mock_now):
+        lines = self.call(export='csv', chunk_size=2)
+        self.assertEqual(lines[0], ','.join(EXPORT_FIELDS))
+        self.assertEqual(len(lines), 5)
+        self.assertTrue(lines[2].endswith(',True,False,False,600,'))
+
+    def test_command_export_jsonl(self, mock_now):
+        rows = [json.loads(line) for line in self.call(export='jsonl', since='2013-03-09')]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['sent_on'], '2013-03-09T00:00:00')
+        self.assertEqual(rows[0]['is_resend'], True)
+        self.assertEqual(rows[0]['time_to_confirm'], None)
+
+
 class TestDoConfirm(TestCase):
 
     def setUp(self):
@@ -68,6 +197,12 @@ class TestDoConfirm(TestCase):
                                                   previous_email='dummy@email.com',
                                                   sender=ANY)
 
+    @patch('confirmanager.models.now')
+    def test_confirm_stores_time_to_confirm(self, mock_now):
+        mock_now.return_value = self.confirmation.sent_on + datetime.timedelta(minutes=5)
+        EmailConfirmation.objects.confirm(self.confirmation.confirmation_key)
+        self.assertEqual(EmailConfirmation.objects.get(pk=self.confirmation.pk).time_to_confirm, 300)
+
     def test_confirm_email_not_exists(self):
         with mock_signal_receiver(email_confirmed) as receiver_mock:
             self.assertFalse(self.confirmation.is_verified)
@@ -99,6 +234,60 @@ class TestLastUnconfirmed(TestCase):
         self.assertEqual(latest_unconfirmed, ('foo@bar.com', True))
 
 
+@override_settings(CONFIRMANAGER_CACHE='default', CONFIRMANAGER_EXPIRES=3,
+                   CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class TestLastUnconfirmedCached(TestCase):
+
+    def setUp(self):
+        get_cache('default').clear()
+        self.user = UserFactory(email='foo@bar.com')
+
+    def test_cached(self):
+        ConfirmationFactory(user=self.user, email='alice@evil.com')
+        EmailConfirmation.objects.last_email_for(self.user)
+        with self.assertNumQueries(0):
+            self.assertEqual(EmailConfirmation.objects.last_email_for(self.user), ('alice@evil.com', False))
+
+    @override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+    def test_invalidated_on_send(self):
+        self.assertEqual(EmailConfirmation.objects.last_email_for(self.user), ('foo@bar.com', True))
+        EmailConfirmation.objects.send_confirmation('alice@evil.com', self.user)
+        self.assertEqual(EmailConfirmation.objects.last_email_for(self.user), ('alice@evil.com', False))
+
+    def test_invalidated_on_confirm(self):
+        confirmation = ConfirmationFactory(user=self.user, email='alice@evil.com')
+        self.assertEqual(EmailConfirmation.objects.last_email_for(self.user), ('alice@evil.com', False))
+        EmailConfirmation.objects.confirm(confirmation.confirmation_key)
+        user = User.objects.get(pk=self.user.pk)
+        self.assertEqual(EmailConfirmation.objects.last_email_for(user), ('alice@evil.com', True))
+
+    def test_confirmed_email_changed_elsewhere(self):
+        self.assertEqual(EmailConfirmation.objects.last_email_for(self.user), ('foo@bar.com', True))
+        self.user.email = 'bob@good.com'
+        self.user.save()
+        with self.assertNumQueries(0):
+            self.assertEqual(EmailConfirmation.objects.last_email_for(self.user), ('bob@good.com', True))
+
+    @patch('confirmanager.caching.set_last_email')
+    def test_pending_timeout(self, mock_set):
+        ConfirmationFactory(user=self.user, email='alice@evil.com',
+                            sent_on=datetime.datetime.now() - datetime.timedelta(days=2))
+        EmailConfirmation.objects.last_email_for(self.user)
+        timeout = mock_set.call_args[0][3]
+        self.assertTrue(0 < timeout <= 24 * 60 * 60)
+
+    @override_settings(CONFIRMANAGER_CACHE_TIMEOUT=60)
+    @patch('confirmanager.caching.get_confirmation_cache')
+    def test_timeout_is_bounded(self, mock_get_cache):
+        mock_cache = mock_get_cache.return_value
+        mock_cache.get.return_value = None
+        EmailConfirmation.objects.last_email_for(self.user)  # nothing pending
+        self.assertEqual(mock_cache.set.call_args[0][2], 60)
+        ConfirmationFactory(user=self.user, email='alice@evil.com')
+        EmailConfirmation.objects.last_email_for(self.user)  # pending for 3 days
+        self.assertEqual(mock_cache.set.call_args[0][2], 60)
+
+
 class TestSend(TestCase):
 
     @override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
@@ -110,9 +299,181 @@ class TestSend(TestCase):
 
         from django.core import mail
         self.assertEqual(confirmation.email, email)
-        self.assertTrue(confirmation.confirmation_key in mail.outbox[0].body)
+        self.assertTrue(encode_key(confirmation.confirmation_key) in mail.outbox[0].body)
         self.assertEqual('hey@bulldog.com', mail.outbox[0].from_email)
 
+    @override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+    def test_send_suppressed(self):
+        SuppressedEmail.objects.suppress([('Foo@Bar.baz', SuppressedEmail.REASON_BOUNCE)])
+        self.assertRaises(EmailSuppressed, EmailConfirmation.objects.send_confirmation, 'foo@bar.baz', UserFactory())
+
+        from django.core import mail
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(EmailConfirmation.objects.count(), 0)
+
+
+class TestSuppress(TestCase):
+
+    def test_suppress_marks_confirmations(self):
+        bounced = ConfirmationFactory(email='dead@bar.com')
+        alive = ConfirmationFactory(email='alive@bar.com')
+        SuppressedEmail.objects.suppress([('dead@bar.com', SuppressedEmail.REASON_BOUNCE)])
+        self.assertTrue(EmailConfirmation.objects.get(pk=bounced.pk).is_bounced)
+        self.assertFalse(EmailConfirmation.objects.get(pk=alive.pk).is_bounced)
+
+    def test_suppress_case_insensitive(self):
+        bounced = ConfirmationFactory(email='Dead@Bar.com')
+        archived = ConfirmationFactory(email='dead@bar.com', archived_reason=EmailConfirmation.ARCHIVED_EXPIRED)
+        SuppressedEmail.objects.suppress([('DEAD@bar.com', SuppressedEmail.REASON_BOUNCE)])
+        self.assertTrue(EmailConfirmation.objects.get(pk=bounced.pk).is_bounced)
+        self.assertTrue(EmailConfirmation.objects.get(pk=archived.pk).is_bounced)
+
+    def test_complaint_upgrades_bounce(self):
+        SuppressedEmail.objects.suppress([('dead@bar.com', SuppressedEmail.REASON_BOUNCE)])
+        SuppressedEmail.objects.suppress([('dead@bar.com', SuppressedEmail.REASON_COMPLAINT)])
+        SuppressedEmail.objects.suppress([('dead@bar.com', SuppressedEmail.REASON_BOUNCE)])
+        self.assertQuerysetEqual(SuppressedEmail.objects.all(), ['SuppressedEmail <dead@bar.com> (complaint)'])
+
+    def test_suppress_concurrent_insert(self):
+        SuppressedEmail.objects.create(email='dead@bar.com', created_on=datetime.datetime.now())
+        with patch.object(SuppressedEmail.objects, 'filter', wraps=SuppressedEmail.objects.filter) as mock_filter:
+            mock_filter.return_value.values_list.return_value = []  # another batch inserted after the check
+            created = SuppressedEmail.objects.suppress([('dead@bar.com', SuppressedEmail.REASON_BOUNCE),
+                                                        ('angry@bar.com', SuppressedEmail.REASON_COMPLAINT)])
+        self.assertEqual(created, 1)
+        self.assertEqual(SuppressedEmail.objects.count(), 2)
+
+    def test_suppress_twice(self):
+        events = [('dead@bar.com', SuppressedEmail.REASON_BOUNCE), ('DEAD@bar.com', SuppressedEmail.REASON_COMPLAINT)]
+        self.assertEqual(SuppressedEmail.objects.suppress(events), 1)
+        self.assertEqual(SuppressedEmail.objects.suppress(events), 0)
+        self.assertQuerysetEqual(SuppressedEmail.objects.all(), ['SuppressedEmail <dead@bar.com> (complaint)'])
+
+
+DSN_REPORT = """From MAILER-DAEMON Thu Mar 14 17:07:38 2013
+From: MAILER-DAEMON@mx.bar.com
+Subject: Undelivered Mail Returned to Sender
+MIME-Version: 1.0
+Content-Type: multipart/report; report-type=delivery-status; boundary="BOUNDARY"
+
+--BOUNDARY
+Content-Type: text/plain
+
+Delivery failed.
+--BOUNDARY
+Content-Type: message/delivery-status
+
+Reporting-MTA: dns; mx.bar.com
+
+Final-Recipient: rfc822; Dead@bar.com
+Action: failed
+Status: 5.1.1
+
+Final-Recipient: rfc822; slow@bar.com
+Action: delayed
+Status: 4.4.1
+
+--BOUNDARY--
+
+"""
+
+ARF_REPORT = """From abuse Thu Mar 14 17:07:38 2013
+From: abuse@isp.com
+Subject: Abuse report
+MIME-Version: 1.0
+Content-Type: multipart/report; report-type=feedback-report; boundary="BOUNDARY"
+
+--BOUNDARY
+Content-Type: text/plain
+
+This is an email abuse report.
+--BOUNDARY
+Content-Type: message/feedback-report
+
+Feedback-Type: abuse
+Original-Rcpt-To: <angry@bar.com>
+
+--BOUNDARY--
+
+"""
+
+
+class TestBounceParsers(TestCase):
+
+    def test_dsn(self):
+        self.assertEqual(list(parse_message(email.message_from_string(DSN_REPORT))),
+                         [('Dead@bar.com', SuppressedEmail.REASON_BOUNCE)])
+
+    def test_arf(self):
+        self.assertEqual(list(parse_message(email.message_from_string(ARF_REPORT))),
+                         [('angry@bar.com', SuppressedEmail.REASON_COMPLAINT)])
+
+    def test_json_dump(self):
+        dump = six.StringIO('{"events": [{"email": "dead@bar.com"}, {"email": "angry@bar.com", "type": "abuse"}]}')
+        self.assertEqual(parse_json_dump(dump), [('dead@bar.com', SuppressedEmail.REASON_BOUNCE),
+                                                 ('angry@bar.com', SuppressedEmail.REASON_COMPLAINT)])
+
+    def test_jsonl_dump(self):
+        dump = six.StringIO('{"email": "dead@bar.com"}\n{"email": "full@bar.com", "bounce_type": "soft"}\n')
+        self.assertEqual(parse_json_dump(dump), [('dead@bar.com', SuppressedEmail.REASON_BOUNCE)])
+
+    def test_jsonl_single_line(self):
+        dump = six.StringIO('{"email": "dead@bar.com", "type": "bounce"}\n')
+        self.assertEqual(parse_json_dump(dump), [('dead@bar.com', SuppressedEmail.REASON_BOUNCE)])
+
+    def test_malformed(self):
+        for payload in (1, [1], {'type': None, 'email': 'dead@bar.com'}, [{'email': 1}], {'events': 'x'}):
+            self.assertRaises(ValueError, parse_events, payload)
+
+
+class TestIngestBounces(TestCase):
+
+    def ingest(self, content, **options):
+        handle, path = tempfile.mkstemp()
+        self.addCleanup(os.remove, path)
+        with os.fdopen(handle, 'w') as dump:
+            dump.write(content)
+        call_command('ingest_bounces', path, stdout=six.StringIO(), **options)
+
+    def test_mbox(self):
+        self.ingest(DSN_REPORT + ARF_REPORT)
+        self.assertQuerysetEqual(SuppressedEmail.objects.order_by('email'),
+                                 ['SuppressedEmail <angry@bar.com> (complaint)',
+                                  'SuppressedEmail <dead@bar.com> (bounce)'])
+
+    def test_json(self):
+        self.ingest('{"email": "dead@bar.com"}\n{"email": "angry@bar.com", "type": "complaint"}\n', format='json')
+        self.assertQuerysetEqual(SuppressedEmail.objects.order_by('email'),
+                                 ['SuppressedEmail <angry@bar.com> (complaint)',
+                                  'SuppressedEmail <dead@bar.com> (bounce)'])
+
+
+@override_settings(CONFIRMANAGER_BOUNCE_TOKEN='secret')
+class TestBounceWebhook(TestCase):
+
+    def post(self, token, payload):
+        return self.client.post(reverse('confirmation-bounces', args=[token]), json.dumps(payload),
+                                content_type='application/json')
+
+    def test_batch(self):
+        response = self.post('secret', {'events': [{'email': 'dead@bar.com', 'type': 'bounce'},
+                                                   {'email': 'angry@bar.com', 'type': 'complaint'},
+                                                   {'email': 'full@bar.com', 'type': 'bounce', 'bounce_type': 'soft'}]})
+        self.assertEqual(json.loads(response.content.decode('utf-8')), {'suppressed': 2})
+        self.assertQuerysetEqual(SuppressedEmail.objects.order_by('email'),
+                                 ['SuppressedEmail <angry@bar.com> (complaint)',
+                                  'SuppressedEmail <dead@bar.com> (bounce)'])
+
+    def test_malformed(self):
+        for payload in ({'type': None, 'email': 'dead@bar.com'}, 1, [{'email': 1}]):
+            self.assertEqual(self.post('secret', payload).status_code, 400)
+        self.assertEqual(SuppressedEmail.objects.count(), 0)
+
+    def test_wrong_token(self):
+        response = self.post('guess', [{'email': 'dead@bar.com'}])
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(SuppressedEmail.objects.count(), 0)
+
 
 @override_settings(CONFIRMANAGER_REDIRECT_URL='/REDIRECT_URL/',
                    CONFIRMANAGER_LOGIN_URL='/LOGIN_URL/',)
@@ -125,17 +486,24 @@ class TestViewExpired(TestCase):
         self.assertTrue(self.client.login(username=self.confirmation.user.username, password='1234'))
         response = self.client.get(reverse('confirmation-view', args=[self.confirmation.confirmation_key]))
         self.assertRedirects(response, '/REDIRECT_URL/')
-        self.assertQuerysetEqual(EmailConfirmation.objects.all(),
+        self.assertQuerysetEqual(EmailConfirmation.objects.active(),
                                  ['EmailConfirmation for <hello@bar.com> (unverified)'])
-        self.assertFalse(EmailConfirmation.objects.get(email='hello@bar.com').is_key_expired)
+        self.assertFalse(EmailConfirmation.objects.active().get(email='hello@bar.com').is_key_expired)
 
     def test_handle_expired_anonymous(self):
         self.client.logout()
         response = self.client.get(reverse('confirmation-view', args=[self.confirmation.confirmation_key]))
         self.assertRedirects(response, '/LOGIN_URL/?email=foo@bar.com&next=/REDIRECT_URL/')
-        self.assertQuerysetEqual(EmailConfirmation.objects.all(),
+        self.assertQuerysetEqual(EmailConfirmation.objects.active(),
                                  ['EmailConfirmation for <hello@bar.com> (unverified)'])
-        self.assertFalse(EmailConfirmation.objects.get(email='hello@bar.com').is_key_expired)
+        self.assertFalse(EmailConfirmation.objects.active().get(email='hello@bar.com').is_key_expired)
+        self.assertTrue(EmailConfirmation.objects.active().get(email='hello@bar.com').is_resend)
+
+    def test_handle_expired_suppressed(self):
+        SuppressedEmail.objects.suppress([('hello@bar.com', SuppressedEmail.REASON_BOUNCE)])
+        response = self.client.get(reverse('confirmation-view', args=[self.confirmation.confirmation_key]))
+        self.assertRedirects(response, '/LOGIN_URL/?email=foo@bar.com&next=/REDIRECT_URL/')
+        self.assertEqual(EmailConfirmation.objects.active().count(), 0)
 
 
 @override_settings(CONFIRMANAGER_REDIRECT_URL='/REDIRECT_URL/',
@@ -172,6 +540,13 @@ class TestViewOk(TestCase):
         self.assertRedirects(response, '/REDIRECT_URL/')
         self.assertIsConfirmed()
 
+    def test_handle_ok_encoded_key(self):
+        url = EmailConfirmation.objects.get_confirmation_url(self.confirmation.confirmation_key)
+        self.assertEqual(url, reverse('confirmation-view', args=[encode_key(self.confirmation.confirmation_key)]))
+        response = self.client.get(url)
+        self.assertRedirects(response, '/LOGIN_URL/?email=hello@bar.com&next=/REDIRECT_URL/')
+        self.assertIsConfirmed()
+
     def test_handle_ok_anonymous(self):
         self.client.logout()
         response = self.client.get(reverse('confirmation-view', args=[self.confirmation.confirmation_key]))
@@ -1,8 +1,9 @@
 # coding: utf-8
 from django.conf.urls import patterns, url
-from .views import ConfirmEmail
+from .views import ConfirmEmail, BounceWebhook
 
 
 urlpatterns = patterns('',
     url(r'^confirm/(?P<confirmation_key>([^/]+))/$', ConfirmEmail.as_view(), name='confirmation-view'),
+    url(r'^bounces/(?P<token>([^/]+))/$', BounceWebhook.as_view(), name='confirmation-bounces'),
 )
\ No newline at end of file
@@ -1,9 +1,13 @@
 # coding: utf-8
 """ From mock-django
     https://github.com/dcramer/mock-django/blob/master/mock_django/signals.py """
+import base64
+import binascii
 import contextlib
+import re
 import mock
 from django.conf import settings
+from django.db import transaction
 
 
 try:
@@ -50,6 +54,53 @@ def get_absolute_url(path):
     return 'http://%s%s' % (domain, path)
 
 
+URL_KEY_RE = re.compile(r'^[A-Za-z0-9_-]{27}$')
+
+
+@contextlib.contextmanager
+def savepoint():
+    """ Rolls the block back to a savepoint if it raises,
+        ``transaction.atomic`` where available (Django 1.6+)
+    """
+    if hasattr(transaction, 'atomic'):
+        with transaction.atomic():
+            yield
+        return
+    sid = transaction.savepoint()
+    try:
+        yield
+    except Exception:
+        transaction.savepoint_rollback(sid)
+        raise
+    else:
+        transaction.savepoint_commit(sid)
+
+
+def encode_key(confirmation_key):
+    """ 40 hex digits -> 27 url-safe base64 chars, used in confirmation urls """
+    raw = binascii.unhexlify(confirmation_key.encode('ascii'))
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_key(url_key):
+    """ Reverse of ``encode_key``, raises ValueError for malformed keys.
+
+        Hex keys are accepted as well, links sent before keys were base64-encoded
+        still work.
+    """
+    try:
+        url_key = str(url_key)
+        if len(url_key) == 40:
+            raw = binascii.unhexlify(url_key.encode('ascii'))
+        elif URL_KEY_RE.match(url_key):
+            raw = base64.urlsafe_b64decode((url_key + '=').encode('ascii'))
+        else:
+            raise ValueError('Malformed confirmation key')
+    except (TypeError, UnicodeError, binascii.Error):
+        raise ValueError('Malformed confirmation key')
+    return binascii.hexlify(raw).decode('ascii')
+
+
 @contextlib.contextmanager
 def mock_signal_receiver(signal, wraps=None, **kwargs):
     """
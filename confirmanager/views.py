@@ -1,21 +1,33 @@
 # coding: utf-8
+import json
+
 from django.conf import settings
 from django.contrib import messages
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseNotFound
 from django.shortcuts import redirect
+from django.utils.crypto import constant_time_compare
+from django.utils.decorators import method_decorator
+from django.views.decorators.csrf import csrf_exempt
 from django.views.generic import View
 from django.utils.translation import ugettext as _
 
-from .models import EmailConfirmation, ConfirmationExpired, ConfirmationAlreadyVerified
+from .bounces import parse_events
+from .utils import decode_key
+from .models import (EmailConfirmation, SuppressedEmail, ConfirmationExpired, ConfirmationAlreadyVerified,
+                     EmailSuppressed)
 
 
 class ConfirmEmail(View):
 
     def get(self, request, confirmation_key):
-        self.confirmation_key = confirmation_key.lower()
         self.populate_context()
+        try:
+            self.confirmation_key = decode_key(confirmation_key)
+        except ValueError:
+            return self.handle_missing_code()
 
         try:
-            confirmation = EmailConfirmation.objects.confirm(confirmation_key)
+            confirmation = EmailConfirmation.objects.confirm(self.confirmation_key)
         except ConfirmationExpired:
             return self.handle_expired()
         except ConfirmationAlreadyVerified:
@@ -34,13 +46,19 @@ class ConfirmEmail(View):
         """ If we can, find a expired email confirmation
             then send it again and return error message
         """
-        confirmation = EmailConfirmation.objects.get(confirmation_key=self.confirmation_key)
-        EmailConfirmation.objects.send_confirmation(confirmation.email, confirmation.user)
-        EmailConfirmation.objects.delete_expired_confirmations()
+        confirmation = EmailConfirmation.objects.active().get(confirmation_key=self.confirmation_key)
+        try:
+            EmailConfirmation.objects.send_confirmation(confirmation.email, confirmation.user, is_resend=True)
+        except EmailSuppressed:
+            resent = False
+        else:
+            resent = True
+        EmailConfirmation.objects.archive_expired_confirmations()
 
         messages.warning(self.request, _("Whoops, that link doesn't seem to be working anymore!"))
-        messages.success(self.request, _("Don't worry, we have sent you a new email. Please check"
-                                         "your email account and use the new confirmation key."))
+        if resent:
+            messages.success(self.request, _("Don't worry, we have sent you a new email. Please check"
+                                             "your email account and use the new confirmation key."))
 
         if self.request.user.is_authenticated():
             # if user is logged in, we want to show the error message on account page
@@ -57,7 +75,7 @@ class ConfirmEmail(View):
 
             TODO: refactor  handle_expired & handle_already_verified
         """
-        confirmation = EmailConfirmation.objects.get(confirmation_key=self.confirmation_key)
+        confirmation = EmailConfirmation.objects.active().get(confirmation_key=self.confirmation_key)
 
         messages.warning(self.request, _("Whoops, that link doesn't seem to be working anymore!"))
         if self.request.user.is_authenticated():
@@ -102,4 +120,27 @@ class ConfirmEmail(View):
         else:
             # if user is logged out we go to login page and display success message
             messages.success(self.request, _("Thanks a lot! You succesfully confirmed the email address."))
-            return redirect("%s?email=%s&next=%s" % (self.login_url, confirmation.email, self.next_url))
\ No newline at end of file
+            return redirect("%s?email=%s&next=%s" % (self.login_url, confirmation.email, self.next_url))
+
+
+class BounceWebhook(View):
+    """ Accepts JSON batches of bounce/complaint events from the mail provider,
+        see ``confirmanager.bounces.parse_events`` for the format.
+        Disabled unless CONFIRMANAGER_BOUNCE_TOKEN is set.
+    """
+    http_method_names = ['post']
+
+    @method_decorator(csrf_exempt)
+    def dispatch(self, request, *args, **kwargs):
+        return super(BounceWebhook, self).dispatch(request, *args, **kwargs)
+
+    def post(self, request, token):
+        expected_token = getattr(settings, 'CONFIRMANAGER_BOUNCE_TOKEN', None)
+        if not expected_token or not constant_time_compare(token, expected_token):
+            return HttpResponseNotFound()
+        try:
+            events = parse_events(json.loads(request.body.decode('utf-8')))
+        except ValueError:  # malformed json or events
+            return HttpResponseBadRequest()
+        suppressed = SuppressedEmail.objects.suppress(events)
+        return HttpResponse(json.dumps({'suppressed': suppressed}), content_type='application/json')
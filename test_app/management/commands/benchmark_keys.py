@@ -0,0 +1,79 @@
+# coding: utf-8
+""" Seeds two scratch tables with random sha1 keys, hex varchar(40) and
+    ConfirmationKeyField column, and reports index size and lookup latency.
+
+    Runs against the configured default database, point settings at
+    postgres or mysql to reproduce there::
+
+        python manage.py benchmark_keys --rows=1000000
+"""
+import binascii
+import os
+import random
+import time
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from confirmanager.fields import Binary, ConfirmationKeyField
+
+
+class Command(BaseCommand):
+    help = 'Compares hex and binary confirmation key index size and lookup latency'
+    option_list = BaseCommand.option_list + (
+        make_option('--rows', dest='rows', type='int', default=100000),
+        make_option('--lookups', dest='lookups', type='int', default=20000),
+        make_option('--chunk-size', dest='chunk_size', type='int', default=5000),
+    )
+
+    def handle(self, *args, **options):
+        keys = [os.urandom(20) for _ in range(options['rows'])]
+        sample = random.sample(keys, min(options['lookups'], len(keys)))
+        variants = (
+            ('hex', 'varchar(40)', lambda key: binascii.hexlify(key).decode('ascii')),
+            ('binary', ConfirmationKeyField().db_type(connection), Binary),
+        )
+        for name, column_type, convert in variants:
+            table = 'confirmanager_benchmark_%s' % name
+            cursor = connection.cursor()
+            try:
+                cursor.execute('CREATE TABLE %s (id integer PRIMARY KEY, confirmation_key %s NOT NULL)'
+                               % (table, column_type))
+                insert = 'INSERT INTO %s (id, confirmation_key) VALUES (%%s, %%s)' % table
+                for start in range(0, len(keys), options['chunk_size']):
+                    cursor.executemany(insert, [(start + i + 1, convert(key)) for i, key
+                                                in enumerate(keys[start:start + options['chunk_size']])])
+                cursor.execute('CREATE INDEX %s_key ON %s (confirmation_key)' % (table, table))
+                transaction.commit_unless_managed()
+                size = self.index_size(cursor, table)
+
+                started = time.time()
+                for key in sample:
+                    cursor.execute('SELECT id FROM %s WHERE confirmation_key = %%s' % table, [convert(key)])
+                    cursor.fetchone()
+                latency = (time.time() - started) / len(sample) * 1e6
+                self.stdout.write('%s (%s): index %s, lookup %.1f us\n'
+                                  % (name, column_type, '%.1f MB' % (size / 2.0 ** 20) if size else 'n/a', latency))
+            finally:
+                cursor.execute('DROP TABLE %s' % table)
+                transaction.commit_unless_managed()
+
+    def index_size(self, cursor, table):
+        """ Bytes, None if the backend is not supported """
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT pg_relation_size(%s)', ['%s_key' % table])
+            return cursor.fetchone()[0]
+        if connection.vendor == 'mysql':
+            cursor.execute('ANALYZE TABLE %s' % table)
+            cursor.fetchall()
+            cursor.execute('SELECT index_length FROM information_schema.tables '
+                           'WHERE table_schema = DATABASE() AND table_name = %s', [table])
+            return cursor.fetchone()[0]
+        if connection.vendor == 'sqlite':
+            try:
+                cursor.execute('SELECT SUM(pgsize) FROM dbstat WHERE name = %s', ['%s_key' % table])
+                return cursor.fetchone()[0]
+            except Exception:  # sqlite built without dbstat
+                return None
+        return None